@@ -1,12 +1,19 @@
 import streamlit as st
 import os
-from pathlib import Path
+import asyncio
 import json
-import requests
-import base64
+import httpx
+import ijson
 from groq import Groq
-import tempfile
+import re
+import hashlib
 import shutil
+import time
+import itertools
+import threading
+from typing import Final
+from collections import Counter, OrderedDict
+from itertools import islice
 from dotenv import load_dotenv
 load_dotenv()
 # Page config
@@ -18,117 +25,572 @@ st.set_page_config(
 
 DEFAULT_GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 
-def fetch_github_repo_structure(github_url, github_token=None):
-    """Fetch repository structure from GitHub API"""
+REQUIREMENTS_FILES = frozenset({'requirements.txt', 'requirements-dev.txt', 'pyproject.toml', 'setup.py'})
+PACKAGE_FILES = frozenset({'package.json', 'package-lock.json', 'yarn.lock'})
+DOCKER_FILES = frozenset({'dockerfile', 'docker-compose.yml', 'docker-compose.yaml'})
+
+# Lowercased filename -> analysis flag it sets
+SPECIAL_FILES = {
+    **dict.fromkeys(REQUIREMENTS_FILES, 'has_requirements'),
+    **dict.fromkeys(PACKAGE_FILES, 'has_package_json'),
+    **dict.fromkeys(DOCKER_FILES, 'has_dockerfile'),
+}
+# Small manifests worth sending to the model; lockfiles are large and noisy
+MANIFEST_FILES = REQUIREMENTS_FILES | {'package.json'} | DOCKER_FILES
+
+def is_manifest(filename):
+    """Whether a lowercased filename is a manifest to fetch for the prompt"""
+    return filename in MANIFEST_FILES or (
+        filename.startswith('requirements') and filename.endswith('.txt')
+    )
+
+# Segments starting with test (tests/, test_foo.py, TestFoo.java), __tests__/,
+# conftest.py, foo_test.go / foo.tests.js suffixes, FooTests.cs / UnitTests/
+TEST_PATH_RE = re.compile(
+    r'(?:^|/)(?:test|__tests__/|conftest\.py$)|[._-]tests?[./]|(?-i:Tests?)[./]',
+    re.IGNORECASE
+)
+
+def classify_file(analysis, filename, path):
+    """Update config/test flags in analysis for a single file"""
+    flag = SPECIAL_FILES.get(filename.lower())
+    if flag:
+        analysis[flag] = True
+        analysis['config_files'].append(filename)
+    # One test file is enough, so skip the regex once the flag is set
+    elif not analysis['has_tests'] and TEST_PATH_RE.search(path):
+        analysis['has_tests'] = True
+
+def file_extension(filename):
+    """Return the lowercased extension of a filename, e.g. '.py'"""
+    stem, dot, ext = filename.rpartition('.')
+    return '.' + ext.lower() if stem and ext else ''
+
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_RAW_MEDIA_TYPE = "application/vnd.github.raw+json"
+
+GITHUB_CLIENT_OPTIONS = {
+    'base_url': GITHUB_API_URL,
+    'http2': True,
+    'headers': {"Accept": "application/vnd.github+json"},
+    'limits': httpx.Limits(max_connections=10),
+    'timeout': 15.0,
+    # Renamed or transferred repos answer with a 301 to the new location
+    'follow_redirects': True
+}
+
+@st.cache_resource
+def get_github_client():
+    """Shared HTTP/2 client for the GitHub API with pooled connections"""
+    return httpx.Client(**GITHUB_CLIENT_OPTIONS)
+
+def hash_token(github_token):
+    """Short digest of a token string, safe to use as a cache key"""
+    return hashlib.blake2b(github_token.encode(), digest_size=8).hexdigest() if github_token else ''
+
+class TokenPool:
+    """Round-robin over GitHub tokens, skipping ones with an exhausted rate limit"""
+    
+    def __init__(self, tokens):
+        self.tokens = tokens
+        # (token, resource) -> reset time; REST 'core' and 'graphql' quotas are separate
+        self.reset_at = {}
+        self._cycle = itertools.cycle(tokens)
+    
+    def next_token(self, resource='core'):
+        """Next token usable for resource, or simply the next one if all are exhausted"""
+        now = time.time()
+        for _ in range(len(self.tokens)):
+            token = next(self._cycle)
+            if self.reset_at.get((token, resource), 0) <= now:
+                return token
+        return next(self._cycle)
+    
+    def record(self, token, headers, resource='core', limited=False):
+        """Track a response's rate limit headers; True if the token is exhausted"""
+        resource = headers.get('X-RateLimit-Resource', resource)
+        if limited or headers.get('X-RateLimit-Remaining') == '0':
+            self.reset_at[(token, resource)] = int(headers.get('X-RateLimit-Reset', 0) or time.time() + 60)
+            return True
+        return False
+
+@st.cache_resource
+def get_token_pool(token_hash, _tokens):
+    """Shared token pool for one set of tokens"""
+    return TokenPool(_tokens)
+
+def token_pool_for(github_token):
+    """Token pool for a comma-separated token string, or None without tokens"""
+    tokens = [token.strip() for token in (github_token or '').split(',') if token.strip()]
+    return get_token_pool(hash_token(github_token), tokens) if tokens else None
+
+def graphql_rate_limited(response):
+    """Whether a GraphQL response reports a RATE_LIMITED error (sent with a 200)"""
     try:
-        # Parse GitHub URL
-        parts = github_url.replace('https://github.com/', '').replace('http://github.com/', '').strip('/')
-        if '/' not in parts:
-            return None, "Invalid GitHub URL format"
-        
-        owner, repo = parts.split('/')[:2]
-        
-        # GitHub API endpoints
-        api_base = f"https://api.github.com/repos/{owner}/{repo}"
-        
-        headers = {}
-        if github_token:
-            headers['Authorization'] = f'token {github_token}'
-        
-        # Get repository info
-        repo_response = requests.get(api_base, headers=headers)
-        if repo_response.status_code != 200:
-            return None, f"Error: {repo_response.status_code} - {repo_response.json().get('message', 'Unknown error')}"
-        
-        repo_data = repo_response.json()
-        
-        # Get repository tree
-        tree_url = f"{api_base}/git/trees/{repo_data['default_branch']}?recursive=1"
-        tree_response = requests.get(tree_url, headers=headers)
-        
-        if tree_response.status_code != 200:
-            return None, f"Error fetching tree: {tree_response.status_code}"
-        
-        tree_data = tree_response.json()
-        
-        analysis = {
-            'name': repo_data['name'],
-            'description': repo_data.get('description', 'No description'),
-            'language': repo_data.get('language', 'Unknown'),
-            'stars': repo_data.get('stargazers_count', 0),
-            'forks': repo_data.get('forks_count', 0),
-            'open_issues': repo_data.get('open_issues_count', 0),
-            'topics': repo_data.get('topics', []),
-            'files': [],
-            'directories': [],
-            'languages': {},
-            'file_count': 0,
-            'has_requirements': False,
-            'has_package_json': False,
-            'has_dockerfile': False,
-            'has_tests': False,
-            'config_files': [],
-            'owner': owner,
-            'repo_url': github_url
-        }
-        
-        for item in tree_data.get('tree', []):
-            if item['type'] == 'blob':
-                analysis['file_count'] += 1
-                path = item['path']
-                ext = Path(path).suffix.lower()
-                
-                if ext:
-                    analysis['languages'][ext] = analysis['languages'].get(ext, 0) + 1
-                
-                # Check for important files
-                filename = os.path.basename(path)
-                if filename.lower() in ['requirements.txt', 'requirements-dev.txt', 'pyproject.toml', 'setup.py']:
-                    analysis['has_requirements'] = True
-                    analysis['config_files'].append(filename)
-                elif filename.lower() in ['package.json', 'package-lock.json', 'yarn.lock']:
-                    analysis['has_package_json'] = True
-                    analysis['config_files'].append(filename)
-                elif filename.lower() in ['dockerfile', 'docker-compose.yml', 'docker-compose.yaml']:
-                    analysis['has_dockerfile'] = True
-                    analysis['config_files'].append(filename)
-                elif 'test' in filename.lower() or filename.startswith('test_'):
-                    analysis['has_tests'] = True
-                
-                if len(analysis['files']) < 100:
-                    analysis['files'].append(path)
+        errors = response.json().get('errors') or []
+    except ValueError:
+        return False
+    return any(error.get('type') == 'RATE_LIMITED' for error in errors)
+
+def send_github_request(send, headers, github_token=None, resource='core', rate_limited=None):
+    """Send a GitHub request, rotating tokens and retrying when one is rate limited"""
+    pool = token_pool_for(github_token)
+    if not pool:
+        return send(headers)
+    
+    for attempt in range(len(pool.tokens)):
+        token = pool.next_token(resource)
+        response = send({**headers, 'Authorization': f'token {token}'})
+        body_limited = rate_limited is not None and rate_limited(response)
+        exhausted = pool.record(token, response.headers, resource, body_limited)
+        # A 2xx/304 that used the last request is still a good answer; keep it
+        failed = response.status_code >= 400 or body_limited
+        if not (exhausted and failed) or attempt == len(pool.tokens) - 1:
+            return response
+        response.close()
+
+# Responses kept for ETag revalidation, shared by all sessions
+ETAG_CACHE_SIZE = 64
+
+class ETagCache:
+    """Thread-safe LRU of GitHub responses keyed by URL"""
+    
+    def __init__(self, max_entries=ETAG_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, url):
+        """Cached entry for url, marking it most recently used"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+    
+    def put(self, url, entry):
+        """Store an entry, evicting the least recently used beyond the cap"""
+        with self._lock:
+            self._entries[url] = entry
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+@st.cache_resource
+def get_etag_cache():
+    """Shared store of GitHub responses keyed by URL"""
+    return ETagCache()
+
+def cached_get(url, headers, raw=False, github_token=None):
+    """GET a GitHub API URL, revalidating any cached response via its ETag"""
+    cache = get_etag_cache()
+    cached = cache.get(url)
+    
+    request_headers = dict(headers)
+    if cached:
+        request_headers['If-None-Match'] = cached['etag']
+    
+    client = get_github_client()
+    response = send_github_request(
+        lambda h: client.get(url, headers=h), request_headers, github_token
+    )
+    # 304 has no body and is not counted against the rate limit
+    if response.status_code == 304 and cached:
+        return 200, cached['json']
+    
+    if raw and response.status_code == 200:
+        data = response.content.decode('utf-8', errors='replace')
+    else:
+        data = response.json()
+    if response.status_code == 200 and response.headers.get('ETag'):
+        cache.put(url, {
+            'etag': response.headers['ETag'],
+            'json': data,
+            'last_modified': response.headers.get('Last-Modified')
+        })
+    return response.status_code, data
+
+def cached_get_items(url, headers, prefix, github_token=None):
+    """Stream items of a JSON array from a GitHub API URL, revalidating via ETag"""
+    cache = get_etag_cache()
+    cached = cache.get(url)
+    
+    request_headers = dict(headers)
+    if cached:
+        request_headers['If-None-Match'] = cached['etag']
+    
+    client = get_github_client()
+    response = send_github_request(
+        lambda h: client.send(client.build_request('GET', url, headers=h), stream=True),
+        request_headers, github_token
+    )
+    if response.status_code == 304 and cached:
+        response.close()
+        return 200, (item for item in cached['json'])
+    if response.status_code != 200:
+        response.close()
+        return response.status_code, None
+    
+    def stream():
+        # Items are parsed as bytes arrive; the list is cached only once the
+        # whole array was read, so a 304 never replays a truncated listing
+        items = []
+        complete = False
+        events = ijson.sendable_list()
+        parser = ijson.items_coro(events, prefix)
+        try:
+            for chunk in response.iter_bytes():
+                parser.send(chunk)
+                for item in events:
+                    items.append(item)
+                    yield item
+                del events[:]
+            parser.close()
+            for item in events:
+                items.append(item)
+                yield item
+            complete = True
+        finally:
+            response.close()
+            if complete and response.headers.get('ETag'):
+                cache.put(url, {
+                    'etag': response.headers['ETag'],
+                    'json': items,
+                    'last_modified': response.headers.get('Last-Modified')
+                })
+    
+    return 200, stream()
+
+# Blobs to classify before the tree walk may stop early
+TREE_SAMPLE_BLOBS = 2000
+# Hard ceiling on blobs classified for very large repositories
+MAX_TREE_BLOBS = 20000
+
+# Metadata plus the root tree oid; the tree itself is streamed from REST
+REPO_QUERY: Final[str] = """query($owner: String!, $name: String!) {
+  repository(owner: $owner, name: $name) {
+    name
+    description
+    stargazerCount
+    forkCount
+    issues(states: OPEN) { totalCount }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+    primaryLanguage { name }
+    defaultBranchRef {
+      name
+      target { ... on Commit { tree { oid } } }
+    }
+  }
+}"""
+
+def fetch_github_repo_graphql(owner, repo, github_token):
+    """Fetch repository info via GraphQL and stream the tree by its oid"""
+    payload = {
+        "query": REPO_QUERY,
+        "variables": {"owner": owner, "name": repo}
+    }
+    client = get_github_client()
+    response = send_github_request(
+        lambda h: client.post("/graphql", json=payload, headers=h), {}, github_token,
+        resource='graphql', rate_limited=graphql_rate_limited
+    )
+    if response.status_code != 200:
+        return None, None, f"Error: {response.status_code} - {response.json().get('message', 'Unknown error')}"
+    
+    result = response.json()
+    if result.get('errors'):
+        return None, None, f"Error: {result['errors'][0].get('message', 'Unknown error')}"
+    
+    repo_data = result['data']['repository']
+    branch_ref = repo_data.get('defaultBranchRef') or {}
+    info = {
+        'name': repo_data['name'],
+        'description': repo_data.get('description') or 'No description',
+        'language': (repo_data.get('primaryLanguage') or {}).get('name', 'Unknown'),
+        'stars': repo_data.get('stargazerCount', 0),
+        'forks': repo_data.get('forkCount', 0),
+        'open_issues': repo_data['issues']['totalCount'],
+        'topics': [node['topic']['name'] for node in repo_data['repositoryTopics']['nodes']],
+        'default_branch': branch_ref.get('name', 'main')
+    }
+    
+    tree_oid = ((branch_ref.get('target') or {}).get('tree') or {}).get('oid')
+    if not tree_oid:
+        # Empty repository: no commits, so no tree
+        return info, (item for item in ()), None
+    
+    # Trees are addressed by oid, so branch names containing '/' are no issue
+    tree_url = f"/repos/{owner}/{repo}/git/trees/{tree_oid}?recursive=1"
+    tree_status, tree_items = cached_get_items(tree_url, {}, 'tree.item', github_token)
+    if tree_status != 200:
+        return None, None, f"Error fetching tree: {tree_status}"
+    return info, tree_items, None
+
+def fetch_github_repo_rest(owner, repo, github_token=None):
+    """Fetch repository info and tree via the REST API"""
+    # GitHub API endpoints
+    api_base = f"/repos/{owner}/{repo}"
+    
+    # Get repository info
+    repo_status, repo_data = cached_get(api_base, {}, github_token=github_token)
+    if repo_status != 200:
+        return None, None, f"Error: {repo_status} - {repo_data.get('message', 'Unknown error')}"
+    
+    # Get repository tree
+    tree_url = f"{api_base}/git/trees/{repo_data['default_branch']}?recursive=1"
+    tree_status, tree_items = cached_get_items(tree_url, {}, 'tree.item', github_token)
+    
+    if tree_status != 200:
+        return None, None, f"Error fetching tree: {tree_status}"
+    
+    info = {
+        'name': repo_data['name'],
+        'description': repo_data.get('description', 'No description'),
+        'language': repo_data.get('language', 'Unknown'),
+        'stars': repo_data.get('stargazers_count', 0),
+        'forks': repo_data.get('forks_count', 0),
+        'open_issues': repo_data.get('open_issues_count', 0),
+        'topics': repo_data.get('topics', []),
+        'default_branch': repo_data['default_branch']
+    }
+    return info, tree_items, None
+
+def tree_saturated(analysis):
+    """Whether further tree entries can only change the language tally"""
+    return (len(analysis['files']) >= 100
+            and len(analysis['directories']) >= 50
+            and analysis['has_requirements']
+            and analysis['has_package_json']
+            and analysis['has_dockerfile']
+            and analysis['has_tests'])
+
+class GitHubFetchError(Exception):
+    """Raised when a repository cannot be fetched, so the failure is not cached"""
+
+@st.cache_data(ttl=600, show_spinner=False)
+def fetch_github_repo_structure_cached(github_url, token_hash, _github_token=None):
+    """Fetch and analyze a repository, cached per URL and token hash"""
+    # Parse GitHub URL
+    parts = github_url.replace('https://github.com/', '').replace('http://github.com/', '').strip('/')
+    if '/' not in parts:
+        raise GitHubFetchError("Invalid GitHub URL format")
+    
+    owner, repo = parts.split('/')[:2]
+    
+    # GraphQL needs authentication; anonymous requests fall back to REST
+    if _github_token:
+        info, tree_items, error = fetch_github_repo_graphql(owner, repo, _github_token)
+    else:
+        info, tree_items, error = fetch_github_repo_rest(owner, repo)
+    
+    if error:
+        raise GitHubFetchError(error)
+    
+    analysis = {
+        **info,
+        'files': [],
+        'directories': [],
+        'languages': Counter(),
+        'file_count': 0,
+        'has_requirements': False,
+        'has_package_json': False,
+        'has_dockerfile': False,
+        'has_tests': False,
+        'config_files': [],
+        'owner': owner,
+        'repo_url': github_url
+    }
+    
+    # Root-level config files give the AI the real dependency list
+    key_files = []
+    
+    for item in tree_items:
+        if item['type'] == 'blob':
+            analysis['file_count'] += 1
+            path = item['path']
+            filename = path.rpartition('/')[2]
+            ext = file_extension(filename)
+            
+            if ext:
+                analysis['languages'][ext] += 1
+            
+            # Check for important files
+            classify_file(analysis, filename, path)
+            if len(key_files) < 10 and '/' not in path and is_manifest(filename.lower()):
+                key_files.append(path)
             
-            elif item['type'] == 'tree' and len(analysis['directories']) < 50:
-                analysis['directories'].append(item['path'])
+            if len(analysis['files']) < 100:
+                analysis['files'].append(path)
         
-        return analysis, None
+        elif item['type'] == 'tree' and len(analysis['directories']) < 50:
+            analysis['directories'].append(item['path'])
+        
+        # Stop once only the (already representative) language tally could change
+        if analysis['file_count'] >= MAX_TREE_BLOBS or (
+                analysis['file_count'] >= TREE_SAMPLE_BLOBS and tree_saturated(analysis)):
+            analysis['truncated'] = True
+            break
+    
+    tree_items.close()
+    analysis['languages'] = dict(analysis['languages'])
     
+    if key_files:
+        analysis['file_contents'] = asyncio.run(fetch_files_async(
+            owner, analysis['name'], key_files, analysis['default_branch'], _github_token
+        ))
+    return analysis
+
+def fetch_github_repo_structure(github_url, github_token=None):
+    """Fetch repository structure from GitHub API"""
+    # Cache on a hash so the raw token never ends up in a cache key
+    token_hash = hash_token(github_token)
+    try:
+        return fetch_github_repo_structure_cached(github_url, token_hash, github_token), None
+    except GitHubFetchError as e:
+        return None, str(e)
     except Exception as e:
         return None, f"Error: {str(e)}"
 
 def fetch_github_file_content(owner, repo, file_path, branch='main', github_token=None):
     """Fetch content of a specific file from GitHub"""
     try:
-        url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
-        headers = {}
-        if github_token:
-            headers['Authorization'] = f'token {github_token}'
-        
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            content = response.json().get('content', '')
-            decoded = base64.b64decode(content).decode('utf-8')
-            return decoded[:2000]  # Limit content
+        url = f"/repos/{owner}/{repo}/contents/{file_path}?ref={branch}"
+        # Raw media type returns the file body instead of base64 JSON
+        headers = {'Accept': GITHUB_RAW_MEDIA_TYPE}
+        status, content = cached_get(url, headers, raw=True, github_token=github_token)
+        if status == 200:
+            return content[:2000]  # Limit content
         return None
     except:
         return None
 
+RATE_LIMIT_FLOOR = 10
+# 2000 characters of UTF-8 are at most 8000 bytes
+FILE_FETCH_BYTES = 8000
+
+async def batched_gather(coros, batch_size=5, delay_s=0.2):
+    """Await coroutines in small batches with a pause between batches"""
+    results = []
+    for i in range(0, len(coros), batch_size):
+        if i:
+            await asyncio.sleep(delay_s)
+        results.extend(await asyncio.gather(*coros[i:i + batch_size]))
+    return results
+
+async def fetch_files_async(owner, repo, paths, branch='main', github_token=None):
+    """Fetch contents of several GitHub files concurrently"""
+    cache = get_etag_cache()
+    pool = token_pool_for(github_token)
+    
+    # Last seen remaining quota per token (None when anonymous)
+    remaining_by_token = {}
+    token_count = len(pool.tokens) if pool else 1
+    
+    def quota_low():
+        return (len(remaining_by_token) == token_count
+                and all(left < RATE_LIMIT_FLOOR for left in remaining_by_token.values()))
+    
+    async def fetch_one(client, path):
+        # Stop issuing requests once every token's quota is nearly used up
+        if quota_low():
+            return None
+        
+        # Same URL keys as fetch_github_file_content, so both share ETags
+        url = f"/repos/{owner}/{repo}/contents/{path}?ref={branch}"
+        cached = cache.get(url)
+        headers = {'Accept': GITHUB_RAW_MEDIA_TYPE}
+        if cached:
+            headers['If-None-Match'] = cached['etag']
+        
+        # Same rotation rule as send_github_request: retry an exhausted
+        # token's failure with the next token
+        attempts = len(pool.tokens) if pool else 1
+        for _ in range(attempts):
+            token = pool.next_token() if pool else None
+            auth = {'Authorization': f'token {token}'} if token else {}
+            try:
+                response = await client.send(
+                    client.build_request('GET', url, headers={**headers, **auth}), stream=True
+                )
+            except httpx.HTTPError:
+                return None
+            
+            remaining = response.headers.get('X-RateLimit-Remaining')
+            if remaining is not None:
+                remaining_by_token[token] = int(remaining)
+            exhausted = pool.record(token, response.headers) if pool else False
+            if not (exhausted and response.status_code >= 400):
+                break
+            await response.aclose()
+        
+        try:
+            if response.status_code == 304 and cached:
+                return cached['json']
+            if response.status_code != 200:
+                return None
+            # Only the first 2000 characters are used, so stop reading early
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= FILE_FETCH_BYTES:
+                    break
+        except httpx.HTTPError:
+            return None
+        finally:
+            await response.aclose()
+        
+        # The capped body is cached too; it still covers every use of the file
+        content = body[:FILE_FETCH_BYTES].decode('utf-8', errors='replace')
+        if response.headers.get('ETag'):
+            cache.put(url, {
+                'etag': response.headers['ETag'],
+                'json': content,
+                'last_modified': response.headers.get('Last-Modified')
+            })
+        return content
+    
+    # An async client is bound to its event loop, so each run gets its own
+    # with the shared GitHub client settings. Small batches with a pause keep
+    # clear of GitHub's secondary rate limits.
+    async with httpx.AsyncClient(**GITHUB_CLIENT_OPTIONS) as client:
+        contents = await batched_gather([fetch_one(client, path) for path in paths])
+    
+    if quota_low():
+        st.warning(f"⚠️ GitHub rate limit nearly exhausted ({max(remaining_by_token.values())} left) - some files were not fetched")
+    
+    return {
+        path: content[:2000]
+        for path, content in zip(paths, contents) if content
+    }
+
+PRUNE_DIRS = frozenset({
+    '.git', 'node_modules', '__pycache__', 'venv',
+    '.venv', 'dist', 'build', '.next', '.idea'
+})
+
+def walk_directory(path):
+    """Yield (relative path, DirEntry) for every file and directory under path"""
+    stack = [(path, '')]
+    while stack:
+        top, rel_top = stack.pop()
+        try:
+            with os.scandir(top) as entries:
+                for entry in entries:
+                    rel_path = f"{rel_top}/{entry.name}" if rel_top else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name in PRUNE_DIRS:
+                            continue
+                        stack.append((entry.path, rel_path))
+                    yield rel_path, entry
+        except OSError:
+            continue
+
 def analyze_local_directory(path):
     """Analyze local project directory"""
     analysis = {
         'files': [],
         'directories': [],
-        'languages': {},
+        'languages': Counter(),
         'file_count': 0,
         'has_requirements': False,
         'has_package_json': False,
@@ -139,94 +601,39 @@ def analyze_local_directory(path):
     }
     
     try:
-        for root, dirs, files in os.walk(path):
-            dirs[:] = [d for d in dirs if d not in [
-                '.git', 'node_modules', '__pycache__', 'venv', 
-                '.venv', 'dist', 'build', '.next', '.idea'
-            ]]
+        for rel_path, entry in walk_directory(path):
+            if entry.is_dir():
+                if len(analysis['directories']) < 50:
+                    analysis['directories'].append(rel_path)
+                continue
             
-            rel_root = os.path.relpath(root, path)
+            analysis['file_count'] += 1
+            ext = file_extension(entry.name)
             
-            for file in files:
-                analysis['file_count'] += 1
-                file_path = os.path.join(rel_root, file)
-                ext = Path(file).suffix.lower()
-                
-                if ext:
-                    analysis['languages'][ext] = analysis['languages'].get(ext, 0) + 1
-                
-                filename = file.lower()
-                if filename in ['requirements.txt', 'requirements-dev.txt', 'pyproject.toml', 'setup.py']:
-                    analysis['has_requirements'] = True
-                    analysis['config_files'].append(file)
-                elif filename in ['package.json', 'package-lock.json', 'yarn.lock']:
-                    analysis['has_package_json'] = True
-                    analysis['config_files'].append(file)
-                elif filename in ['dockerfile', 'docker-compose.yml', 'docker-compose.yaml']:
-                    analysis['has_dockerfile'] = True
-                    analysis['config_files'].append(file)
-                elif 'test' in filename or file.startswith('test_'):
-                    analysis['has_tests'] = True
-                
-                if len(analysis['files']) < 100:
-                    analysis['files'].append(file_path)
+            if ext:
+                analysis['languages'][ext] += 1
+            
+            classify_file(analysis, entry.name, rel_path)
             
-            if len(analysis['directories']) < 50:
-                analysis['directories'].extend([os.path.join(rel_root, d) for d in dirs])
+            if len(analysis['files']) < 100:
+                analysis['files'].append(rel_path)
     
     except Exception as e:
         st.error(f"Error analyzing directory: {e}")
     
+    analysis['languages'] = dict(analysis['languages'])
     return analysis
 
 def read_local_file(file_path, max_lines=50):
     """Read local file content"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()[:max_lines]
-            return ''.join(lines)
+        # islice stops reading after max_lines instead of loading the whole file
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            return ''.join(islice(f, max_lines))
     except:
         return None
 
-def create_analysis_prompt(analysis, is_github=False):
-    """Create prompt for Groq API"""
-    
-    if is_github:
-        prompt = f"""You are an expert software documentation writer. Analyze this GitHub repository:
-
-Repository: {analysis.get('name', 'Unknown')}
-Description: {analysis.get('description', 'No description')}
-Primary Language: {analysis.get('language', 'Unknown')}
-Stars: {analysis.get('stars', 0)} | Forks: {analysis.get('forks', 0)} | Issues: {analysis.get('open_issues', 0)}
-Topics: {', '.join(analysis.get('topics', []))}
-
-Project Statistics:
-- Total Files: {analysis['file_count']}
-- File Types: {json.dumps(analysis['languages'], indent=2)}
-- Has Dependencies: {analysis['has_requirements'] or analysis['has_package_json']}
-- Has Docker: {analysis['has_dockerfile']}
-- Has Tests: {analysis['has_tests']}
-- Config Files: {', '.join(analysis['config_files'])}
-
-Repository Structure (sample):
-{chr(10).join(analysis['files'][:30])}
-"""
-    else:
-        prompt = f"""You are an expert software documentation writer. Analyze this local project:
-
-Project Statistics:
-- Total Files: {analysis['file_count']}
-- File Types: {json.dumps(analysis['languages'], indent=2)}
-- Has Dependencies: {analysis['has_requirements'] or analysis['has_package_json']}
-- Has Docker: {analysis['has_dockerfile']}
-- Has Tests: {analysis['has_tests']}
-- Config Files: {', '.join(analysis['config_files'])}
-
-Project Structure (sample):
-{chr(10).join(analysis['files'][:30])}
-"""
-    
-    prompt += """
+ANALYSIS_TAIL: Final[str] = """
 Based on this information, provide a detailed analysis including:
 1. Project type and purpose
 2. Technology stack and frameworks
@@ -237,39 +644,8 @@ Based on this information, provide a detailed analysis including:
 7. Notable patterns or best practices
 
 Format as a structured, detailed analysis."""
-    
-    return prompt
-
-def create_readme_prompt(project_name, analysis_result, github_analysis=None, 
-                        user_description="", github_username="", 
-                        license_type="MIT", custom_sections=""):
-    """Create prompt for README generation"""
-    
-    github_info = ""
-    if github_analysis:
-        github_info = f"""
-GitHub Repository Info:
-- Stars: {github_analysis.get('stars', 0)}
-- Forks: {github_analysis.get('forks', 0)}
-- Issues: {github_analysis.get('open_issues', 0)}
-- Topics: {', '.join(github_analysis.get('topics', []))}
-- Repository URL: {github_analysis.get('repo_url', '')}
-"""
-    
-    prompt = f"""Generate a professional, comprehensive README.md file for this GitHub repository.
-
-Project Name: {project_name}
-License: {license_type}
-{"GitHub Username: " + github_username if github_username else ""}
-
-{github_info}
-
-Project Analysis:
-{analysis_result}
-
-{"User Description: " + user_description if user_description else ""}
-{"Additional Sections: " + custom_sections if custom_sections else ""}
 
+README_TAIL: Final[str] = """
 Create a README.md that includes:
 1. Project title with badges (shields.io format for stars, forks, license, language)
 2. Compelling description with key features
@@ -295,25 +671,143 @@ Make it visually appealing and comprehensive.
 Include actual badge URLs using shields.io.
 
 Return ONLY the README markdown content."""
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_analysis_prompt(is_github, name, description, language, stars, forks, open_issues,
+                          topics, total_files, languages, has_dependencies, has_docker,
+                          has_tests, config_files, files, file_contents):
+    """Build the analysis prompt from hashable project fields"""
     
-    return prompt
+    if is_github:
+        parts = [
+            "You are an expert software documentation writer. Analyze this GitHub repository:\n\n",
+            "Repository: ", str(name), "\n",
+            "Description: ", str(description), "\n",
+            "Primary Language: ", str(language), "\n",
+            f"Stars: {stars} | Forks: {forks} | Issues: {open_issues}\n",
+            "Topics: ", ', '.join(topics), "\n\n",
+        ]
+        structure_label = "Repository Structure (sample):\n"
+    else:
+        parts = ["You are an expert software documentation writer. Analyze this local project:\n\n"]
+        structure_label = "Project Structure (sample):\n"
+    
+    parts += [
+        "Project Statistics:\n",
+        "- Total Files: ", total_files, "\n",
+        "- File Types: ", json.dumps(dict(languages), indent=2), "\n",
+        "- Has Dependencies: ", str(has_dependencies), "\n",
+        "- Has Docker: ", str(has_docker), "\n",
+        "- Has Tests: ", str(has_tests), "\n",
+        "- Config Files: ", ', '.join(config_files), "\n\n",
+        structure_label,
+        '\n'.join(files), "\n",
+    ]
+    
+    if file_contents:
+        parts.append("\nKey Files:\n")
+        for path, content in file_contents:
+            parts += ["\n--- ", path, " ---\n", content, "\n"]
+    
+    return "".join(parts) + ANALYSIS_TAIL
 
-def call_groq_api(api_key, prompt, model="llama-3.3-70b-versatile"):
+def create_analysis_prompt(analysis, is_github=False):
+    """Create prompt for Groq API"""
+    
+    if is_github:
+        total_files = f"{analysis['file_count']}{'+ (sampled)' if analysis.get('truncated') else ''}"
+        file_contents = tuple(analysis.get('file_contents', {}).items())
+    else:
+        total_files = str(analysis['file_count'])
+        file_contents = ()
+    
+    # Normalize to hashable values so reruns with the same analysis hit the cache
+    return build_analysis_prompt(
+        is_github,
+        analysis.get('name', 'Unknown'),
+        analysis.get('description', 'No description'),
+        analysis.get('language', 'Unknown'),
+        analysis.get('stars', 0),
+        analysis.get('forks', 0),
+        analysis.get('open_issues', 0),
+        tuple(analysis.get('topics', [])),
+        total_files,
+        tuple(analysis['languages'].items()),
+        analysis['has_requirements'] or analysis['has_package_json'],
+        analysis['has_dockerfile'],
+        analysis['has_tests'],
+        tuple(analysis['config_files']),
+        tuple(analysis['files'][:30]),
+        file_contents
+    )
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_readme_prompt(project_name, analysis_result, github_info, user_description,
+                        github_username, license_type, custom_sections):
+    """Build the README prompt from hashable fields"""
+    
+    header = "".join([
+        "Generate a professional, comprehensive README.md file for this GitHub repository.\n\n",
+        "Project Name: ", project_name, "\n",
+        "License: ", license_type, "\n",
+        "GitHub Username: " + github_username if github_username else "", "\n\n",
+        github_info, "\n\n",
+        "Project Analysis:\n",
+        analysis_result, "\n\n",
+        "User Description: " + user_description if user_description else "", "\n",
+        "Additional Sections: " + custom_sections if custom_sections else "", "\n",
+    ])
+    
+    return header + README_TAIL
+
+def create_readme_prompt(project_name, analysis_result, github_analysis=None, 
+                        user_description="", github_username="", 
+                        license_type="MIT", custom_sections=""):
+    """Create prompt for README generation"""
+    
+    github_info = ""
+    if github_analysis:
+        github_info = "".join([
+            "\nGitHub Repository Info:\n",
+            "- Stars: ", str(github_analysis.get('stars', 0)), "\n",
+            "- Forks: ", str(github_analysis.get('forks', 0)), "\n",
+            "- Issues: ", str(github_analysis.get('open_issues', 0)), "\n",
+            "- Topics: ", ', '.join(github_analysis.get('topics', [])), "\n",
+            "- Repository URL: ", github_analysis.get('repo_url', ''), "\n",
+        ])
+    
+    return build_readme_prompt(
+        project_name, analysis_result, github_info, user_description,
+        github_username, license_type, custom_sections
+    )
+
+@st.cache_resource
+def get_groq_client(api_key):
+    """Shared Groq client per API key, reusing its connection pool"""
+    return Groq(api_key=api_key)
+
+SYSTEM_PROMPT: Final[str] = "You are an expert technical writer specializing in software documentation and README files. Create professional, comprehensive, and visually appealing documentation."
+
+def build_messages(prompt):
+    """Build chat messages for a Groq completion"""
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def call_groq_api(api_key, prompt, model="llama-3.3-70b-versatile", status=None):
     """Call Groq API"""
     try:
-        client = Groq(api_key=api_key)
+        client = get_groq_client(api_key)
         
         chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert technical writer specializing in software documentation and README files. Create professional, comprehensive, and visually appealing documentation."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            messages=build_messages(prompt),
             model=model,
             temperature=0.7,
             max_tokens=4096,
@@ -322,8 +816,84 @@ def call_groq_api(api_key, prompt, model="llama-3.3-70b-versatile"):
         return chat_completion.choices[0].message.content
     
     except Exception as e:
+        # Flag the failure so the error text is never cached as an analysis
+        if status is not None:
+            status['error'] = str(e)
         return f"Error calling Groq API: {str(e)}"
 
+def stream_groq_api(api_key, prompt, model="llama-3.3-70b-versatile", status=None):
+    """Call Groq API, yielding completion text as it arrives"""
+    try:
+        client = get_groq_client(api_key)
+        
+        chat_completion = client.chat.completions.create(
+            messages=build_messages(prompt),
+            model=model,
+            temperature=0.7,
+            max_tokens=4096,
+            stream=True,
+        )
+        
+        for chunk in chat_completion:
+            yield chunk.choices[0].delta.content or ""
+    
+    except Exception as e:
+        # Flag the failure so partial output isn't mistaken for a full README
+        if status is not None:
+            status['error'] = str(e)
+        yield f"Error calling Groq API: {str(e)}"
+
+# Per-user and private: artifacts can describe private repositories
+ARTIFACT_CACHE_DIR = os.path.join(
+    os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'),
+    'readme_gen'
+)
+ARTIFACT_CACHE_MAX_FILES = 200
+
+def artifact_cache_key(prompt, model):
+    """Disk cache key for an artifact generated from a prompt and model"""
+    return hashlib.sha1(f"{model}|{prompt}".encode('utf-8')).hexdigest()
+
+def cache_get(key):
+    """Load a cached artifact dict from disk"""
+    path = os.path.join(ARTIFACT_CACHE_DIR, f"{key}.json")
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        # Touch on read so eviction drops the least recently used artifacts
+        os.utime(path)
+        return value
+    except (OSError, ValueError):
+        return None
+
+def evict_artifacts():
+    """Delete the oldest cached artifacts beyond ARTIFACT_CACHE_MAX_FILES"""
+    with os.scandir(ARTIFACT_CACHE_DIR) as entries:
+        files = [entry for entry in entries if entry.name.endswith('.json')]
+    if len(files) <= ARTIFACT_CACHE_MAX_FILES:
+        return
+    files.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in files[:len(files) - ARTIFACT_CACHE_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def cache_put(key, value):
+    """Persist an artifact dict to disk"""
+    try:
+        os.makedirs(ARTIFACT_CACHE_DIR, mode=0o700, exist_ok=True)
+        path = os.path.join(ARTIFACT_CACHE_DIR, f"{key}.json")
+        # Write then rename so a concurrent reader never sees a partial file;
+        # owner-only permissions from creation
+        fd = os.open(f"{path}.tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump(value, f)
+        os.replace(f"{path}.tmp", path)
+        evict_artifacts()
+    except OSError:
+        pass
+
 # Initialize session state
 if 'analysis_result' not in st.session_state:
     st.session_state.analysis_result = None
@@ -362,7 +932,7 @@ with st.sidebar:
     github_token = st.text_input(
         "GitHub Token (Optional)",
         type="password",
-        help="For private repos or higher rate limits"
+        help="For private repos or higher rate limits. Separate several tokens with commas to rotate between them"
     )
     
     st.divider()
@@ -440,7 +1010,7 @@ with tab1:
                         st.session_state.github_analysis = analysis
                         
                         col1, col2, col3, col4, col5 = st.columns(5)
-                        col1.metric("Files", analysis['file_count'])
+                        col1.metric("Files", f"{analysis['file_count']}+" if analysis.get('truncated') else analysis['file_count'])
                         col2.metric("Languages", len(analysis['languages']))
                         col3.metric("⭐ Stars", analysis['stars'])
                         col4.metric("🔱 Forks", analysis['forks'])
@@ -467,6 +1037,8 @@ with tab1:
                     with st.spinner("Scanning..."):
                         analysis = analyze_local_directory(local_path)
                         st.session_state.project_analysis = analysis
+                        # Don't carry a previously fetched repo's info into this project
+                        st.session_state.github_analysis = None
                         st.session_state.local_path = local_path
                         
                         col1, col2, col3, col4 = st.columns(4)
@@ -518,7 +1090,16 @@ with tab2:
             height=100
         )
         
-        if st.button("🚀 Analyze with AI", type="primary", use_container_width=True):
+        col1, col2 = st.columns([3, 1])
+        
+        with col1:
+            analyze = st.button("🚀 Analyze with AI", type="primary", use_container_width=True)
+        
+        with col2:
+            # Re-analyze always asks the model again instead of using the disk cache
+            reanalyze = bool(st.session_state.analysis_result) and st.button("🔄 Re-analyze", use_container_width=True)
+        
+        if analyze or reanalyze:
             with st.spinner("🤖 AI analyzing..."):
                 
                 if st.session_state.project_analysis:
@@ -540,8 +1121,19 @@ Features: {manual['features']}
 
 Provide comprehensive analysis with insights."""
                 
-                result = call_groq_api(api_key, prompt, model)
-                st.session_state.analysis_result = result
+                # Persisting the analysis keeps the README prompt built from it
+                # stable across sessions, so the README cache can hit too
+                cache_key = artifact_cache_key(prompt, model)
+                cached = None if reanalyze else cache_get(cache_key)
+                
+                if cached and cached.get('analysis_result'):
+                    st.session_state.analysis_result = cached['analysis_result']
+                else:
+                    status = {}
+                    result = call_groq_api(api_key, prompt, model, status)
+                    st.session_state.analysis_result = result
+                    if not status.get('error'):
+                        cache_put(cache_key, {'analysis_result': result})
         
         if st.session_state.analysis_result:
             st.success("✅ Analysis complete!")
@@ -574,26 +1166,39 @@ with tab3:
         col1, col2 = st.columns([3, 1])
         
         with col1:
-            if st.button("✨ Generate README", type="primary", use_container_width=True):
-                with st.spinner("🤖 Generating README..."):
-                    prompt = create_readme_prompt(
-                        project_name,
-                        st.session_state.analysis_result,
-                        st.session_state.github_analysis,
-                        extra_desc,
-                        github_username,
-                        license_type,
-                        custom_sections
-                    )
-                    
-                    readme = call_groq_api(api_key, prompt, model)
-                    st.session_state.readme_content = readme
-                    st.success("✅ README generated!")
+            generate = st.button("✨ Generate README", type="primary", use_container_width=True)
         
         with col2:
-            if st.session_state.readme_content:
-                if st.button("🔄 Regenerate", use_container_width=True):
-                    st.rerun()
+            # Regenerate always asks the model again instead of using the disk cache
+            regenerate = bool(st.session_state.readme_content) and st.button("🔄 Regenerate", use_container_width=True)
+        
+        if generate or regenerate:
+            prompt = create_readme_prompt(
+                project_name,
+                st.session_state.analysis_result,
+                st.session_state.github_analysis,
+                extra_desc,
+                github_username,
+                license_type,
+                custom_sections
+            )
+            # Every input to the README is in the prompt, so it keys the cache
+            cache_key = artifact_cache_key(prompt, model)
+            cached = None if regenerate else cache_get(cache_key)
+            
+            if cached and cached.get('readme_content'):
+                st.session_state.readme_content = cached['readme_content']
+                st.success("✅ Loaded previously generated README! Use Regenerate for a fresh one")
+            else:
+                # Render tokens as they arrive; write_stream returns the full text
+                status = {}
+                readme = st.write_stream(stream_groq_api(api_key, prompt, model, status))
+                st.session_state.readme_content = readme
+                if status.get('error'):
+                    st.error("❌ README generation failed before completing")
+                else:
+                    cache_put(cache_key, {'readme_content': readme})
+                    st.success("✅ README generated!")
 
 with tab4:
     st.header("📄 Preview & Download")